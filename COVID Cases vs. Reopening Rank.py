@@ -11,9 +11,10 @@ import us
 import matplotlib.pyplot as plt
 import numpy as np
 from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import cross_val_score
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error
+from string_cleaning import parse_ranks
+from cross_validation import kfold_labels, group_labels, fold_statistics, cv_score
 
 np.random.seed(100)
 
@@ -157,34 +158,7 @@ def add_dummies(df, var):
     df_with_dummies = pd.concat([df, dummies], axis=1)
     return df_with_dummies
 
-def strip_strings(df, var, strip_chars):
-    """
-    This function strips a set of characters from a string variable, and replaces
-    that variable with the stripped strings
-
-    Parameters
-    ----------
-    df : dataframe
-        pandas dataframe that includes a variable with extraneous characters
-    var : string
-        name of variable whos values contain extraneous characters
-    strip_chars : string
-        characters to strip from string
-
-    Returns
-    -------
-    df : dataframe
-        dataframe passed to function that now includes the stripped strings as
-        column values
-    """
-    formatted = []
-    for value in df[var]:
-        temp = value.strip(strip_chars)
-        formatted.append(temp)
-    df[var] = formatted
-    return df
-
-def backward_selection_helper(remaining_predictors, y):
+def backward_selection_helper(stats, all_predictors, remaining_predictors):
     """
     This a helper function for the backward_selection function. From the remaining
     predictors, it removes one predictor at a time (and replaces it before 
@@ -192,10 +166,12 @@ def backward_selection_helper(remaining_predictors, y):
 
     Parameters
     ----------
-    remaining_predictors : dataframe
+    stats : dictionary
+        fold statistics of all possible predictors, from fold_statistics
+    all_predictors : list of strings
+        names of all possible predictors, in the order used by stats
+    remaining_predictors : list of strings
         predictors that have not been removed in previous iterations
-    y : dataframe
-        dependent variable
 
     Returns
     -------
@@ -211,20 +187,22 @@ def backward_selection_helper(remaining_predictors, y):
     this_best_pred = None
     remove_p = None
     for p in remaining_predictors:
-        try_predictors = remaining_predictors.drop(columns=[p])
-        this_score = np.mean(cross_val_score(LinearRegression(), try_predictors,\
-                                             y, scoring='neg_mean_squared_error'))*-1
+        try_predictors = [q for q in remaining_predictors if q != p]
+        cols = [all_predictors.index(q) for q in try_predictors]
+        this_score = cv_score(stats, cols)
             
         if this_score > this_best_score:
             this_best_score = this_score
-            this_best_pred = list(try_predictors.columns)
+            this_best_pred = try_predictors
             remove_p = p
 
     return this_best_score, this_best_pred, remove_p
 
-def backward_selection(all_predictors, y):
+def backward_selection(all_predictors, y, labels=None):
     """
-    This function performs backward selection on a set of features.
+    This function performs backward selection on a set of features. The fold
+    statistics are computed once, so that each candidate model is scored
+    without copying the data.
 
     Parameters
     ----------
@@ -232,6 +210,8 @@ def backward_selection(all_predictors, y):
         includes all possible predictors
     y : dataframe
         dependent variable
+    labels : numpy array, optional
+        fold number of each observation. If None, 5 consecutive folds are used.
 
     Returns
     -------
@@ -240,21 +220,22 @@ def backward_selection(all_predictors, y):
     best_predictors : list of strings
         names of predictors in best model
     """
+    if labels is None:
+        labels = kfold_labels(len(y))
+    stats = fold_statistics(all_predictors, y, labels)
+    predictor_names = list(all_predictors.columns)
+
     # start with assumption that full model is best model
-    best_score = np.mean(cross_val_score(LinearRegression(), all_predictors, y,\
-                         scoring='neg_mean_squared_error'))*-1
-    best_predictors = list(all_predictors.columns)
+    best_score = cv_score(stats)
+    best_predictors = predictor_names
     
     removed = []
     
     for i in range(len(all_predictors)): # max possible iterations
-        if len(removed) > 0:
-            remaining_predictors = all_predictors.drop(columns=removed)
-        else:
-            remaining_predictors = all_predictors
+        remaining_predictors = [p for p in predictor_names if p not in removed]
         
         new_score, new_predictors, remove_p = backward_selection_helper(
-            remaining_predictors, y)
+            stats, predictor_names, remaining_predictors)
         if new_score < best_score:
             best_score = new_score
             best_predictors = new_predictors
@@ -264,10 +245,11 @@ def backward_selection(all_predictors, y):
     
     return best_score, best_predictors           
 
-def ols(x, y):
+def ols(x, y, labels=None):
     """
     This function fits a simple linear regression on the training data, and 
-    tests the model's predictions against the test data.
+    tests the model's predictions against the test data. If fold labels are
+    given, it also reports the cross-validated mean squared error.
 
     Parameters
     ----------
@@ -275,6 +257,9 @@ def ols(x, y):
         includes selected predictors
     y : dataframe
         dependent variable
+    labels : numpy array, optional
+        fold number of each observation, e.g. from group_labels for
+        leave-one-state-out cross-validation
 
     Returns
     -------
@@ -290,7 +275,10 @@ def ols(x, y):
     y_pred = model.predict(x_test)
     mse = round(mean_squared_error(y_test, y_pred), 4)
     
-    return {'train r-squared':train_rsq, 'test r-squared':test_rsq, 'mse':mse}
+    results = {'train r-squared':train_rsq, 'test r-squared':test_rsq, 'mse':mse}
+    if labels is not None:
+        results['cv mse'] = round(cv_score(fold_statistics(x, y, labels)), 4)
+    return results
 
 def main():
     path = Path.cwd()
@@ -331,7 +319,7 @@ def main():
             'Reopening Score (x) vs. Total Cases per Capita (y)')
         
     # Convert rank to int so it can be used in the regression model
-    df = strip_strings(df, 'rank', '()')
+    df['rank'] = parse_ranks(df['rank'])
     
     # Add state dummies to consider adding state fixed effects to model
     df_state_fe = add_dummies(df, 'state')
@@ -356,22 +344,25 @@ def main():
     y_fe = df_state_fe['new_cases_pc']
     score_new_fe, features_new_fe = backward_selection(numeric_x_fe, y_fe)
     
-    # Perform OLS with selected features
-    total_pc_results = ols(df[features_total], y_total)
+    # Perform OLS with selected features, and report leave-one-state-out
+    # cross-validated mse
+    state_labels = group_labels(df['state'])
+    state_labels_fe = group_labels(df_state_fe['state'])
+    total_pc_results = ols(df[features_total], y_total, state_labels)
     print('To predict total COVID-19 cases per capita, we use the following \
           predictors and obtain the following results:')
     print('Features: ', features_total)
     print('Results: ', total_pc_results)
     print('\n')
     
-    new_pc_results = ols(df[features_new], y_new)
+    new_pc_results = ols(df[features_new], y_new, state_labels)
     print('To predict new COVID-19 cases per capita, we use the following predictors\
           and obtain the following results:')
     print('Features: ', features_new)
     print('Results: ', new_pc_results)
     print('\n')
     
-    new_pc_results_fe = ols(df_state_fe[features_new_fe], y_fe)
+    new_pc_results_fe = ols(df_state_fe[features_new_fe], y_fe, state_labels_fe)
     print('To predict new COVID-19 cases per capita including state fixed effects,\
           we use the following predictors and obtain the following results:')
     print('Features: ', features_new_fe)
@@ -11,6 +11,7 @@ from bs4 import BeautifulSoup
 import requests
 import numpy as np
 import matplotlib.pyplot as plt
+from string_cleaning import format_state_names, parse_ranks
 
 def csv_to_df(path, fname, cols):
     file = path.joinpath(fname)
@@ -31,11 +32,11 @@ def join_to_panel(df1, df2, id_col, new_col, stubnames, j):
     -------
     df_panel : joined panel dataframe
     """
-    df2[id_col] = [obs.upper() for obs in list(df2[id_col])]
+    df2[id_col] = format_state_names(df2[id_col])
     df2 = df2[df2[id_col].isin(list(df1[id_col]))]
     df1 = df1.sort_values(by=[id_col])
     df2 = df2.sort_values(by=[id_col])
-    df1[new_col] = list(df2[new_col].str.strip('()').astype(int))
+    df1[new_col] = parse_ranks(df2[new_col])
     df_panel = pd.wide_to_long(df1, stubnames=stubnames, i=[id_col, new_col], j=j,\
                                   sep=' ').reset_index()
     df_panel[j] = pd.to_datetime(df_panel[j], format='%y%m%d')
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cross-validation kernel for linear regression. The data is written once into a
+single contiguous float64 array, ordered by fold, so that every fold is a view
+rather than a copy. Each fold's sufficient statistics are computed once, and
+the training statistics for a fold are obtained by subtracting that fold's
+contribution from the totals. Models for every fold, and for every subset of
+predictors, are then fit from these small matrices without touching the data
+again.
+"""
+import numpy as np
+
+def kfold_labels(n_obs, n_splits=5, shuffle=False, random_state=None):
+    """
+    This function assigns each observation to one of n_splits folds. Without
+    shuffling, folds are consecutive blocks of observations, which matches the
+    default used by sklearn's cross_val_score.
+
+    Parameters
+    ----------
+    n_obs : int
+        number of observations
+    n_splits : int
+        number of folds
+    shuffle : bool
+        whether to shuffle observations before assigning folds
+    random_state : int or None
+        seed used when shuffling
+
+    Returns
+    -------
+    labels : numpy array
+        fold number of each observation
+    """
+    if n_splits < 2 or n_splits > n_obs:
+        raise ValueError(f'n_splits must be between 2 and {n_obs}, got {n_splits}')
+    sizes = np.full(n_splits, n_obs // n_splits)
+    sizes[:n_obs % n_splits] += 1
+    labels = np.repeat(np.arange(n_splits), sizes)
+    if shuffle:
+        labels = np.random.default_rng(random_state).permutation(labels)
+    return labels
+
+def repeated_kfold_labels(n_obs, n_splits=5, n_repeats=10, random_state=None):
+    """
+    This function assigns observations to shuffled folds several times.
+
+    Parameters
+    ----------
+    n_obs : int
+        number of observations
+    n_splits : int
+        number of folds in each repetition
+    n_repeats : int
+        number of repetitions
+    random_state : int or None
+        seed used when shuffling
+
+    Returns
+    -------
+    labels : numpy array
+        array of shape (n_repeats, n_obs) with the fold number of each
+        observation in each repetition
+    """
+    if n_repeats < 1:
+        raise ValueError(f'n_repeats must be at least 1, got {n_repeats}')
+    rng = np.random.default_rng(random_state)
+    labels = kfold_labels(n_obs, n_splits)
+    return np.stack([rng.permutation(labels) for i in range(n_repeats)])
+
+def group_labels(groups):
+    """
+    This function assigns each group, such as a state, to its own fold, so
+    that cross-validation leaves one group out at a time.
+
+    Parameters
+    ----------
+    groups : pandas series, list or numpy array
+        group of each observation
+
+    Returns
+    -------
+    labels : numpy array
+        fold number of each observation
+    """
+    return np.unique(np.asarray(groups), return_inverse=True)[1].reshape(-1)
+
+def fold_statistics(x, y, labels):
+    """
+    This function computes the sufficient statistics of every fold. A column
+    of ones, the predictors and the dependent variable are written column by
+    column into one contiguous float64 array Z, ordered by fold, and Z'Z is
+    computed on each fold's slice of that array. The predictors and the
+    dependent variable are centered on their overall means as they are
+    written, so that subtracting a fold from the totals stays accurate when a
+    column's mean is large relative to its spread.
+
+    Z is the only copy of the data. For repeated cross-validation, each later
+    repetition reorders Z into one more buffer of the same size.
+
+    Parameters
+    ----------
+    x : dataframe or numpy array
+        predictors
+    y : series or numpy array
+        dependent variable
+    labels : numpy array
+        fold number of each observation, or an array of shape
+        (n_repeats, n_obs) for repeated cross-validation
+
+    Returns
+    -------
+    stats : dictionary
+        'total' is Z'Z over all observations and 'folds' stacks Z'Z of every
+        fold (of every repetition) along the first axis
+
+    Raises
+    ------
+    ValueError
+        if labels do not match the number of observations, any repetition
+        has fewer than 2 folds, or any value is NaN or infinite
+    """
+    if hasattr(x, 'columns'):
+        names = list(x.columns)
+        columns = [np.asarray(x[c], dtype=np.float64) for c in x.columns]
+    else:
+        x = np.asarray(x, dtype=np.float64)
+        columns = list(x.reshape(len(x), -1).T)
+        names = [f'column {j}' for j in range(len(columns))]
+    names.append(getattr(y, 'name', None) or 'y')
+    columns.append(np.asarray(y, dtype=np.float64))
+    n_obs = len(columns[-1])
+    labels = np.atleast_2d(labels)
+    if labels.shape[0] == 0 or labels.shape[1] != n_obs:
+        raise ValueError(f'labels must have {n_obs} observations per repetition, '
+                         f'got shape {labels.shape}')
+
+    orders = []
+    bounds = []
+    for repeat in labels:
+        order = np.argsort(repeat, kind='stable')
+        repeat_bounds = np.flatnonzero(np.diff(repeat[order])) + 1
+        if len(repeat_bounds) == 0:
+            raise ValueError('cross-validation needs at least 2 folds, got 1')
+        orders.append(order)
+        bounds.append(repeat_bounds)
+
+    # fill Z in the order of the first repetition, centering each column
+    z = np.empty((n_obs, len(columns) + 1))
+    z[:, 0] = 1
+    bad = []
+    for j, column in enumerate(columns, start=1):
+        np.take(column, orders[0], out=z[:, j])
+        if np.isfinite(z[:, j]).all():
+            z[:, j] -= column.mean()
+        else:
+            bad.append(str(names[j - 1]))
+    if bad:
+        raise ValueError(f'input contains NaN or infinite values in: {", ".join(bad)}')
+    total = z.T @ z
+
+    folds = []
+    position = np.empty(n_obs, dtype=np.intp)
+    buffer = None
+    for i, (order, repeat_bounds) in enumerate(zip(orders, bounds)):
+        if i > 0:
+            # rows of Z are currently in the previous repetition's order
+            if buffer is None:
+                buffer = np.empty_like(z)
+            position[orders[i - 1]] = np.arange(n_obs)
+            np.take(z, position[order], axis=0, out=buffer)
+            z, buffer = buffer, z
+        for start, stop in zip(np.r_[0, repeat_bounds], np.r_[repeat_bounds, n_obs]):
+            fold = z[start:stop]
+            folds.append(fold.T @ fold)
+    return {'total': total, 'folds': np.stack(folds)}
+
+def fold_mse(stats, cols=None):
+    """
+    This function fits a linear regression with an intercept on the training
+    data of every fold and returns the mean squared error on each test fold.
+    All folds are solved at once as a stack of small matrices. Like sklearn's
+    LinearRegression, the predictors are centered on the training means and
+    the minimum norm solution is used when they are collinear.
+
+    Parameters
+    ----------
+    stats : dictionary
+        output of fold_statistics
+    cols : list of ints or None
+        positions of the predictors to include in the model. If None, all
+        predictors are included.
+
+    Returns
+    -------
+    mse : numpy array
+        mean squared error on each test fold
+    """
+    n_stat = stats['total'].shape[0]
+    if cols is None:
+        cols = np.arange(n_stat - 2)
+    idx = np.r_[0, np.asarray(cols, dtype=int) + 1, n_stat - 1]
+    test = stats['folds'][:, idx][:, :, idx]
+    train = stats['total'][np.ix_(idx, idx)] - test
+
+    # center the training data using the sums stored in the first row
+    n_train = train[:, 0, 0]
+    means = train[:, 0, 1:] / n_train[:, None]
+    centered = train[:, 1:, 1:] - n_train[:, None, None] * means[:, :, None] * means[:, None, :]
+    beta = np.linalg.pinv(centered[:, :-1, :-1]) @ centered[:, :-1, -1:]
+    intercept = means[:, -1] - (means[:, None, :-1] @ beta)[:, 0, 0]
+
+    # residual sum of squares of the test fold from its Z'Z
+    w = np.concatenate([-intercept[:, None], -beta[:, :, 0], np.ones((len(test), 1))], axis=1)
+    rss = (w[:, None, :] @ test @ w[:, :, None])[:, 0, 0]
+    return rss / test[:, 0, 0]
+
+def cv_score(stats, cols=None):
+    """
+    This function returns the cross-validated mean squared error of a linear
+    regression, averaged over folds.
+
+    Parameters
+    ----------
+    stats : dictionary
+        output of fold_statistics
+    cols : list of ints or None
+        positions of the predictors to include in the model
+
+    Returns
+    -------
+    score : float
+        mean squared error averaged over folds
+    """
+    return float(np.mean(fold_mse(stats, cols)))
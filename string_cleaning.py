@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vectorized cleaning of the string formats produced by web scraping.py, such as
+parenthesized ranks like "(1)", state names and numeric strings with thousands
+separators. Columns are cleaned with pandas' .str methods and compiled regexes.
+Scraped columns such as states and ranks repeat a small set of values, so when
+a sample of the column has few distinct values, only the distinct values are
+cleaned and the results are mapped back to every cell.
+"""
+import re
+import numpy as np
+import pandas as pd
+
+# integers are limited to 18 digits so that every match fits in an int64
+RANK_PATTERN = re.compile(r'^\s*\(?([0-9]{1,18})\)?\s*$')
+TOO_LONG_PATTERN = re.compile(r'[0-9]{19}')
+SAMPLE_SIZE = 10000
+MAX_DISTINCT_FRACTION = 0.1
+
+def encode(values):
+    """
+    This function prepares a column for cleaning. If an evenly spaced sample
+    of the column has few distinct values, the column is factorized so that
+    only its distinct values need to be cleaned.
+
+    Parameters
+    ----------
+    values : numpy array
+        column of values, as an object array
+
+    Returns
+    -------
+    codes : numpy array or None
+        position of each value in strings, or -1 for missing values. None if
+        the column was not factorized.
+    strings : pandas series
+        distinct non-missing values, or the whole column if it was not
+        factorized
+    """
+    sample = values[::max(len(values) // SAMPLE_SIZE, 1)]
+    if len(pd.unique(sample)) <= MAX_DISTINCT_FRACTION * len(sample):
+        codes, uniques = pd.factorize(values)
+        return codes, pd.Series(uniques, dtype=object)
+    return None, pd.Series(values, dtype=object)
+
+def decode(cleaned, codes, fill):
+    """
+    This function maps values cleaned by distinct value back to every cell.
+
+    Parameters
+    ----------
+    cleaned : numpy array
+        cleaned values, in the order of the strings returned by encode
+    codes : numpy array or None
+        codes returned by encode
+    fill : scalar
+        value for missing cells
+
+    Returns
+    -------
+    decoded : numpy array
+        cleaned value of every cell
+    """
+    if codes is None:
+        return cleaned
+    return np.append(cleaned, np.array([fill], dtype=cleaned.dtype))[codes]
+
+def str_method(strings, method):
+    """
+    This function applies a pandas .str method to a series of strings. Values
+    that are missing or not strings become NaN.
+
+    Parameters
+    ----------
+    strings : pandas series
+        strings to clean
+    method : function
+        takes the .str accessor of a series and returns a series
+
+    Returns
+    -------
+    result : pandas series
+        result of the method
+    """
+    try:
+        return method(strings.str)
+    except AttributeError:   # the series contains no strings at all
+        return pd.Series(np.nan, index=strings.index)
+
+def check_malformed(values, bad, label, reason):
+    """
+    This function raises an error that identifies every malformed cell.
+
+    Parameters
+    ----------
+    values : pandas series, list or numpy array
+        column of values that was cleaned
+    bad : numpy array of bools
+        whether each cell is malformed
+    label : string
+        description of the values, used in the error message
+    reason : string
+        why the malformed cells could not be cleaned
+
+    Raises
+    ------
+    ValueError
+        if any cell is malformed
+    """
+    if bad.any():
+        positions = np.flatnonzero(bad)
+        values = np.asarray(values, dtype=object)
+        examples = ', '.join(f'{i}: {values[i]!r}' for i in positions[:5])
+        raise ValueError(f'{len(positions)} {label}(s) {reason} '
+                         f'(position: value) {examples}')
+
+def format_state_names(values):
+    """
+    This function formats state names so that columns scraped from different
+    sources can be compared and merged.
+
+    Parameters
+    ----------
+    values : pandas series, list or numpy array
+        state names
+
+    Returns
+    -------
+    formatted : numpy array
+        state names without surrounding whitespace, in uppercase, with NaN
+        where values were missing
+    """
+    values = np.asarray(values, dtype=object)
+    codes, strings = encode(values)
+    cleaned = str_method(strings, lambda s: s.strip().str.upper()).to_numpy(dtype=object)
+    not_str = pd.isna(cleaned) & ~pd.isna(strings.to_numpy())
+    check_malformed(values, decode(not_str, codes, False), 'state name',
+                    'are not strings')
+    return decode(cleaned, codes, np.nan)
+
+def extract_integers(values, pattern, label, thousands=None):
+    """
+    This function parses a column of strings into integers. Every cell is
+    validated against a regex that matches only ASCII digits (and thousands
+    separators) before conversion, so that malformed cells raise an error
+    that identifies all of them.
+
+    Parameters
+    ----------
+    values : pandas series, list or numpy array
+        strings that contain integers
+    pattern : compiled regex or string
+        regex that matches a whole valid string. Without thousands, its first
+        group captures the digits.
+    label : string
+        description of the values, used in the error message
+    thousands : string, optional
+        thousands separator to remove from matching strings
+
+    Returns
+    -------
+    ints : numpy array
+        values as 64-bit integers
+
+    Raises
+    ------
+    ValueError
+        if any value is missing, is not a string, does not match the pattern
+        or has more than 18 digits
+    """
+    values = np.asarray(values, dtype=object)
+    codes, strings = encode(values)
+    if thousands:
+        matched = str_method(strings, lambda s: s.match(pattern)).eq(True)
+        digits = strings
+    else:
+        digits = str_method(strings, lambda s: s.extract(pattern, expand=False))
+        matched = digits.notna()
+
+    bad = decode(~matched.to_numpy(), codes, True)
+    if bad.any():
+        too_long = np.zeros(len(values), dtype=bool)
+        for i in np.flatnonzero(bad):
+            if isinstance(values[i], str):
+                too_long[i] = bool(TOO_LONG_PATTERN.search(values[i].replace(thousands or '', '')))
+        check_malformed(values, too_long, label, 'are out of int64 range')
+        check_malformed(values, bad, label, 'could not be parsed as integers')
+
+    if thousands:
+        # int() ignores the whitespace that the pattern allows
+        digits = digits.str.replace(thousands, '', regex=False)
+    return decode(digits.astype(np.int64).to_numpy(), codes, 0)
+
+def parse_ranks(values):
+    """
+    This function converts parenthesized ranks, such as "(1)", to integers.
+
+    Parameters
+    ----------
+    values : pandas series, list or numpy array
+        ranks as scraped from the webpage
+
+    Returns
+    -------
+    ranks : numpy array
+        ranks as 64-bit integers
+    """
+    return extract_integers(values, RANK_PATTERN, 'rank')
+
+def parse_integers(values, thousands=','):
+    """
+    This function converts numeric strings that may contain thousands
+    separators, such as "1,290", to integers.
+
+    Parameters
+    ----------
+    values : pandas series, list or numpy array
+        numeric strings
+    thousands : string
+        thousands separator between groups of three digits
+
+    Returns
+    -------
+    ints : numpy array
+        values as 64-bit integers
+    """
+    sep = re.escape(thousands)
+    pattern = rf'^\s*(?:[0-9]{{1,3}}(?:{sep}[0-9]{{3}}){{1,5}}|[0-9]{{1,18}})\s*$'
+    return extract_integers(values, pattern, 'number', thousands)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Checks that the cross-validation kernel matches sklearn's cross_val_score.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import (KFold, LeaveOneGroupOut, RepeatedKFold,
+                                     cross_val_score)
+from cross_validation import (kfold_labels, repeated_kfold_labels, group_labels,
+                              fold_statistics, cv_score)
+
+def make_data(offset=0.0, scale=1.0, n_obs=200, seed=0):
+    rng = np.random.default_rng(seed)
+    x = offset + scale * rng.normal(size=(n_obs, 3))
+    y = (x - offset) @ [1.0, -2.0, 0.5] / scale + rng.normal(size=n_obs)
+    return pd.DataFrame(x, columns=['a', 'b', 'c']), y
+
+def sklearn_mse(x, y, cv, groups=None):
+    return -np.mean(cross_val_score(LinearRegression(), x, y, cv=cv, groups=groups,
+                                    scoring='neg_mean_squared_error'))
+
+def split_labels(splitter, n_obs, n_splits):
+    """Converts each repetition of a sklearn splitter to a row of fold labels."""
+    splits = list(splitter.split(np.zeros(n_obs)))
+    labels = np.empty((len(splits) // n_splits, n_obs), dtype=int)
+    for i, (train, test) in enumerate(splits):
+        labels[i // n_splits, test] = i % n_splits
+    return labels
+
+@pytest.mark.parametrize('offset, scale', [(0.0, 1.0), (1e6, 1.0), (1e4, 1e-3)])
+def test_kfold(offset, scale):
+    x, y = make_data(offset, scale)
+    stats = fold_statistics(x, y, kfold_labels(len(y)))
+    assert cv_score(stats) == pytest.approx(sklearn_mse(x, y, KFold(5)), rel=1e-6)
+    assert cv_score(stats, [0, 2]) == pytest.approx(
+        sklearn_mse(x[['a', 'c']], y, KFold(5)), rel=1e-6)
+
+@pytest.mark.parametrize('offset, scale', [(0.0, 1.0), (1e6, 1.0), (1e4, 1e-3)])
+def test_leave_one_group_out(offset, scale):
+    x, y = make_data(offset, scale)
+    groups = np.random.default_rng(1).integers(0, 13, len(y))
+    stats = fold_statistics(x, y, group_labels(groups))
+    expected = sklearn_mse(x, y, LeaveOneGroupOut(), groups)
+    assert cv_score(stats) == pytest.approx(expected, rel=1e-6)
+
+@pytest.mark.parametrize('offset, scale', [(0.0, 1.0), (1e6, 1.0), (1e4, 1e-3)])
+def test_repeated_kfold(offset, scale):
+    x, y = make_data(offset, scale)
+    splitter = RepeatedKFold(n_splits=5, n_repeats=3, random_state=2)
+    stats = fold_statistics(x, y, split_labels(splitter, len(y), 5))
+    assert stats['folds'].shape[0] == 15
+    assert cv_score(stats) == pytest.approx(sklearn_mse(x, y, splitter), rel=1e-6)
+
+def test_single_fold_raises():
+    x, y = make_data()
+    with pytest.raises(ValueError, match='at least 2 folds'):
+        fold_statistics(x, y, group_labels(['Alaska'] * len(y)))
+    with pytest.raises(ValueError, match='labels must have'):
+        fold_statistics(x, y, np.empty((0, len(y)), dtype=int))
+
+class LabelSplitter:
+    """Runs sklearn over the folds of precomputed labels, one row per repetition."""
+    def __init__(self, labels):
+        self.labels = labels
+
+    def split(self, x, y=None, groups=None):
+        for repeat in self.labels:
+            for k in np.unique(repeat):
+                yield np.flatnonzero(repeat != k), np.flatnonzero(repeat == k)
+
+    def get_n_splits(self, x=None, y=None, groups=None):
+        return sum(len(np.unique(repeat)) for repeat in self.labels)
+
+def test_repeated_kfold_labels():
+    x, y = make_data()
+    labels = repeated_kfold_labels(len(y), 5, 3, 4)
+    for repeat in labels:
+        np.testing.assert_array_equal(np.sort(repeat), kfold_labels(len(y), 5))
+    stats = fold_statistics(x, y, labels)
+    assert stats['folds'].shape[0] == 15
+    expected = sklearn_mse(x, y, LabelSplitter(labels))
+    assert cv_score(stats) == pytest.approx(expected, rel=1e-6)
+
+def test_repeated_kfold_labels_needs_a_repeat():
+    with pytest.raises(ValueError, match='n_repeats must be at least 1'):
+        repeated_kfold_labels(100, 5, 0)
+
+@pytest.mark.parametrize('column, value', [('b', np.nan), ('c', np.inf), ('y', np.nan)])
+def test_non_finite_input_raises(column, value):
+    x, y = make_data()
+    y = pd.Series(y, name='y')
+    if column == 'y':
+        y[3] = value
+    else:
+        x.loc[3, column] = value
+    with pytest.raises(ValueError, match=f'NaN or infinite values in: {column}$'):
+        fold_statistics(x, y, kfold_labels(len(y)))
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Checks the parsing, validation and error reporting of string_cleaning.py.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from string_cleaning import format_state_names, parse_ranks, parse_integers
+
+def test_parse_ranks():
+    assert parse_ranks(['(1)', ' (2) ', '3']).tolist() == [1, 2, 3]
+
+def test_parse_ranks_many_distinct():
+    ranks = ['(%d)' % i for i in range(20000)]
+    np.testing.assert_array_equal(parse_ranks(ranks), np.arange(20000))
+
+@pytest.mark.parametrize('values, message', [
+    (['(1)', None, '(3)'], "1 rank(s) could not be parsed as integers (position: value) 1: None"),
+    (['(1)', 3, '(3)'], "1 rank(s) could not be parsed as integers (position: value) 1: 3"),
+    (['(1)', '(x)', '(²)', ''], "3 rank(s) could not be parsed as integers "
+                                "(position: value) 1: '(x)', 2: '(²)', 3: ''"),
+    ([1, 2], "2 rank(s) could not be parsed as integers (position: value) 0: 1, 1: 2"),
+    (['(1)', '(99999999999999999999)'], "1 rank(s) are out of int64 range "
+                                        "(position: value) 1: '(99999999999999999999)'"),
+])
+def test_parse_ranks_reports_malformed_cells(values, message):
+    with pytest.raises(ValueError) as error:
+        parse_ranks(values)
+    assert str(error.value) == message
+
+def test_parse_ranks_reports_malformed_cells_when_factorized():
+    values = ['(1)', '(2)'] * 10000
+    values[5] = None
+    values[7] = '(x)'
+    with pytest.raises(ValueError, match=r"^2 rank\(s\) .* 5: None, 7: '\(x\)'$"):
+        parse_ranks(values)
+
+def test_parse_integers():
+    values = ['1,290', ' 5 ', '12,345,678', '1234']
+    assert parse_integers(values).tolist() == [1290, 5, 12345678, 1234]
+
+@pytest.mark.parametrize('value', ['1,29', '12,3456', ',123', '1,,234'])
+def test_parse_integers_rejects_misplaced_separators(value):
+    with pytest.raises(ValueError, match='1 number'):
+        parse_integers(['1,000', value])
+
+def test_parse_integers_reports_out_of_range():
+    with pytest.raises(ValueError, match=r"^1 number\(s\) are out of int64 range .* 1: '1,000"):
+        parse_integers(['1,000', '1,000,000,000,000,000,000'])
+
+def test_format_state_names_keeps_nan():
+    formatted = format_state_names([' Alaska', np.nan, 'new york', None])
+    assert formatted[0] == 'ALASKA' and formatted[2] == 'NEW YORK'
+    assert pd.isna(formatted[1]) and pd.isna(formatted[3])
+
+def test_format_state_names_rejects_non_strings():
+    with pytest.raises(ValueError, match=r'^1 state name\(s\) are not strings .* 1: 3$'):
+        format_state_names(['Alaska', 3])
+
+def test_non_default_index():
+    # like the sorted slice of df2 in join_to_panel
+    df = pd.DataFrame({'state': ['ohio', 'alaska', 'texas'],
+                       'rank': ['(3)', '(1)', '(2)']}, index=[10, 4, 7])
+    df = df[df['state'] != 'texas'].sort_values(by=['state'])
+    assert format_state_names(df['state']).tolist() == ['ALASKA', 'OHIO']
+    assert parse_ranks(df['rank']).tolist() == [1, 3]
+    df.loc[4, 'rank'] = 'x'
+    with pytest.raises(ValueError, match="position: value\\) 0: 'x'"):
+        parse_ranks(df['rank'])